@@ -1,72 +1,512 @@
 import argparse
-from collections import defaultdict
+import gc
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus
 
 from falkordb import FalkorDB
-import pandas as pd
-
-def export_graph(graph_name, host, port):
-    # Connect to FalkorDB
-    db = FalkorDB(host=host, port=port)
-    g = db.select_graph(graph_name)
-
-    # Export Nodes by Label
-    nodes_result = g.ro_query("MATCH (n) RETURN ID(n), labels(n), properties(n)")
-    nodes_by_label = defaultdict(list)
-
-    for record in nodes_result.result_set:
-        node_id = record[0]
-        labels = record[1]
-        props = record[2] or {}
-
-        # Handle nodes with multiple labels or no labels
-        if labels:
-            for label in labels:
-                node = {"id": node_id}
-                node.update(props)
-                nodes_by_label[label].append(node)
+from redis.utils import HIREDIS_AVAILABLE
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+# Number of rows fetched per query page. Bounds peak memory on both the
+# server and the client instead of materializing the whole graph at once.
+PAGE_SIZE = 100_000
+
+# Arrow's CSV writer internally slices tables into batches of this many rows.
+BATCH_SIZE = 65536
+
+# Characters that force a CSV field to be quoted (RFC 4180).
+_STRUCTURAL_RE = '[",\r\n]'
+
+# Graph entity IDs are int64 on the wire; declaring them explicitly lets
+# Arrow store them in packed int64 buffers and format them with its
+# C-level integer-to-ASCII path rather than inferring types per chunk.
+NODE_ID_COLS = frozenset({"id"})
+EDGE_ID_COLS = frozenset({"id", "from_id", "to_id"})
+
+# 1 MiB output buffer: the writers flush in few large writes instead of
+# many short ones, which otherwise dominate in the small-row regime.
+BUFFER_SIZE = 1 << 20
+
+# Upper bound on concurrent per-type edge scans.
+MAX_EDGE_WORKERS = 8
+
+# File name bucket for nodes that carry no label. Internally those nodes
+# travel under _NO_LABEL — the empty string is not a legal label name, so
+# the sentinel can never collide with a label that really exists in the
+# graph; "unlabeled" could.
+UNLABELED = "unlabeled"
+_NO_LABEL = ""
+
+def _cache_dir():
+    """Resolve the schema cache directory at call time.
+
+    Discovered schemas are cached there, one file per host/port/graph, so
+    repeated exports of the same graph skip the discovery scans.
+    ``GRAPH_EXPORTER_CACHE_DIR`` overrides the location outright (tests and
+    sandboxed runs point it at a scratch directory); otherwise the XDG
+    convention applies: ``$XDG_CACHE_HOME/graph-exporter``, defaulting to
+    ``~/.cache/graph-exporter``.
+    """
+    override = os.environ.get("GRAPH_EXPORTER_CACHE_DIR")
+    if override:
+        return override
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "graph-exporter")
+
+
+def _node_query(label, prop_keys):
+    """Build the paginated per-label node query with a flat projection.
+
+    Projecting each property as a top-level column (``n.`key```) instead of
+    returning a ``properties(n)`` map spares the server a per-row map
+    serialization and the client a per-row dict construction: rows come back
+    as fixed-width tuples that drop straight into the column lists.
+    """
+    returns = ", ".join(["ID(n)"] + [f"n.`{key}`" for key in prop_keys])
+    if label == _NO_LABEL:
+        match = "MATCH (n) WHERE size(labels(n)) = 0 AND ID(n) > $last"
+    else:
+        match = f"MATCH (n:`{label}`) WHERE ID(n) > $last"
+    return f"{match} RETURN {returns} ORDER BY ID(n) LIMIT $lim"
+
+
+def _edge_query(edge_type, prop_keys):
+    """Build the paginated per-type edge query with a flat projection.
+
+    One scan per relationship type: no two edge workers touch the same
+    adjacency bucket, so the per-type scans parallelize cleanly.
+    """
+    returns = ", ".join(
+        ["ID(e)", "ID(a)", "ID(b)"] + [f"e.`{key}`" for key in prop_keys]
+    )
+    return (
+        f"MATCH (a)-[e:`{edge_type}`]->(b) WHERE ID(e) > $last "
+        f"RETURN {returns} ORDER BY ID(e) LIMIT $lim"
+    )
+
+
+def _iter_pages(g, query, page_size=None):
+    """Yield result-set pages using a keyset cursor on the leading ID column.
+
+    Seeking with ``WHERE ID(..) > $last`` is O(1) per page, unlike
+    ``SKIP $off`` which re-scans the skipped prefix on every query.
+    ``page_size`` defaults to PAGE_SIZE at call time, so tests can shrink
+    the page by patching the module attribute.
+    """
+    if page_size is None:
+        page_size = PAGE_SIZE
+    last = -1
+    while True:
+        rows = g.ro_query(query, {"last": last, "lim": page_size}).result_set
+        if not rows:
+            break
+        full_page = len(rows) == page_size
+        last = rows[-1][0]
+        yield rows
+        # Drop the generator's reference before fetching the next page, so
+        # peak residency is one page rather than two.
+        del rows
+        if not full_page:
+            break
+
+
+def _flatten_column(values):
+    """Serialize a column of irregular values to strings.
+
+    Containers (lists/maps coming back from FalkorDB) are flattened to JSON
+    once here — the CSV writer cannot emit nested Arrow columns, and orjson
+    serializes them in C far faster than repr or json.dumps would. Scalars
+    in mixed-type columns fall back to str().
+    """
+    out = []
+    for value in values:
+        if value is None:
+            out.append(None)
+        elif isinstance(value, (dict, list)):
+            out.append(orjson.dumps(value, default=str).decode())
+        else:
+            out.append(str(value))
+    return pa.array(out, type=pa.string())
+
+
+def _chunk_to_table(cols, int_cols, schema=None):
+    """Convert a dict of column lists to a pyarrow.Table.
+
+    ID columns get an explicit int64 type; property columns are inferred,
+    falling back to strings when a column mixes incompatible value types.
+    Passing the ``schema`` a file was opened with builds every column with
+    its known type up front via a safe cast — safe so that a lossy
+    conversion (say, floats arriving in a column the first page pinned to
+    int64) raises instead of silently truncating values.
+    """
+    if schema is not None:
+        try:
+            return pa.table({
+                name: pa.array(values).cast(schema.field(name).type)
+                for name, values in cols.items()
+            })
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            pass  # fall back to inference; the caller reconciles schemas
+
+    arrays = {}
+    for name, values in cols.items():
+        if name in int_cols:
+            arrays[name] = pa.array(values, type=pa.int64())
+            continue
+        try:
+            arr = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arr = _flatten_column(values)
+        if pa.types.is_nested(arr.type):
+            # Homogeneous list/map properties infer as nested Arrow types,
+            # which the CSV writer rejects; flatten them to JSON strings.
+            arr = _flatten_column(values)
+        if pa.types.is_null(arr.type):
+            # A page where every cell of a property is missing must not pin
+            # the file schema to the null type; string accepts any later
+            # value, and nulls are still written as empty cells either way.
+            arr = arr.cast(pa.string())
+        arrays[name] = arr
+    return pa.table(arrays)
+
+
+def _cast_to_file_schema(table, schema, output_format):
+    """Reconcile a chunk whose inferred schema differs from the open file's.
+
+    A plain cast handles the benign drift (e.g. a column that was all-null
+    in this page). When a column genuinely conflicts with the type the
+    first page pinned — say ints followed by floats — CSV output widens
+    just that column to strings via :func:`_flatten_column`, since CSV is
+    untyped and every cell is rendered as text anyway. Parquet files carry
+    their schema and cannot widen a column after the file is opened, so a
+    conflict there raises with a pointer at ``--format csv``.
+    """
+    try:
+        return table.cast(schema)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        if output_format == "parquet":
+            raise ValueError(
+                f"column types changed mid-export and Parquet cannot widen "
+                f"a column after the file is created (expected {schema}, "
+                f"got {table.schema}); re-run with --format csv"
+            )
+    arrays = []
+    for field in schema:
+        column = table.column(field.name)
+        try:
+            arrays.append(column.cast(field.type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            arrays.append(_flatten_column(column.to_pylist()))
+    return pa.table(dict(zip(schema.names, arrays)))
+
+
+def _write_chunk(table, sink, include_header):
+    """Append one chunk of rows to an open CSV sink.
+
+    When no string cell (or header name) in the chunk contains a structural
+    character, the chunk is written with quoting disabled, skipping the
+    per-cell quoting pass entirely; otherwise Arrow quotes as needed. The
+    scan runs in C via pyarrow.compute, and quoting is a per-field property
+    of CSV, so chunks of the same file may legitimately differ.
+    """
+    candidates = [c for c in table.columns if pa.types.is_string(c.type)]
+    if include_header:
+        candidates.append(pa.array(list(table.schema.names)))
+    quoting_style = "none"
+    for column in candidates:
+        if pc.any(pc.match_substring_regex(column, _STRUCTURAL_RE)).as_py():
+            quoting_style = "needed"
+            break
+    pacsv.write_csv(
+        table, sink,
+        write_options=pacsv.WriteOptions(
+            batch_size=BATCH_SIZE,
+            include_header=include_header,
+            quoting_style=quoting_style,
+        ),
+    )
+
+
+class _ChunkWriter:
+    """Appends table chunks to one output file in the selected format.
+
+    The format name doubles as the file extension: ``csv`` goes through the
+    buffered CSV path, ``parquet`` through a ParquetWriter with zstd level 1
+    (near-free CPU, unlike high gzip levels) and dictionary encoding, which
+    shrinks the repetitive property columns typical of graph data.
+    """
+
+    def __init__(self, basename, output_format, schema):
+        self.filename = f"{basename}.{output_format}"
+        self._sink = None
+        self._parquet = None
+        self._first = True
+        if output_format == "parquet":
+            self._parquet = pq.ParquetWriter(
+                self.filename, schema,
+                compression="zstd", compression_level=1,
+            )
+        else:
+            self._sink = pa.output_stream(self.filename, buffer_size=BUFFER_SIZE)
+
+    def write(self, table):
+        if self._parquet is not None:
+            self._parquet.write_table(table)
         else:
-            # Handle nodes without labels
-            node = {"id": node_id}
-            node.update(props)
-            nodes_by_label["unlabeled"].append(node)
-
-    # Export each node label to its own CSV file
-    for label, nodes in nodes_by_label.items():
-        filename = f"nodes_{label}.csv"
-        pd.DataFrame(nodes).to_csv(filename, index=False)
-        print(f"✅ Exported {len(nodes)} nodes with label '{label}' to {filename}")
-
-    # Export Edges by Type
-    edges_result = g.ro_query(
-        "MATCH (a)-[e]->(b) RETURN ID(e), TYPE(e), ID(a), ID(b), properties(e)"
+            _write_chunk(table, self._sink, include_header=self._first)
+        self._first = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._sink is not None:
+            self._sink.close()
+
+
+def _connect(host, port):
+    """Create a FalkorDB client, checking that the hiredis RESP parser is used.
+
+    redis-py parses every result row through hiredis (a C extension) when it
+    is installed, and falls back to a much slower pure-Python parser when it
+    is not. That fallback should never go unnoticed on the result-ingestion
+    hot path, so warn loudly if it happens.
+    """
+    if not HIREDIS_AVAILABLE:
+        print("⚠️  hiredis is not installed; falling back to the pure-Python "
+              "RESP parser. Install it for significantly faster exports.")
+    # Every client here is confined to one thread and issues its queries
+    # sequentially, so pin a single connection instead of going through a
+    # pool checkout/checkin on every paginated query.
+    return FalkorDB(host=host, port=port, single_connection_client=True)
+
+
+def _export_nodes_of_label(g, label, prop_keys, output_format):
+    """Export nodes of a single label (or the unlabeled bucket).
+
+    Result rows are fixed-width tuples ``(id, prop0, prop1, ...)`` in
+    ``prop_keys`` order, so assembly is one positional append per cell —
+    no per-row dict allocation at all. The labelless bucket arrives as the
+    ``_NO_LABEL`` sentinel and only takes the ``unlabeled`` display name
+    here, at file-naming time.
+    """
+    query = _node_query(label, prop_keys)
+    display = UNLABELED if label == _NO_LABEL else label
+
+    writer = None
+    schema = None
+    count = 0
+    try:
+        for chunk in _iter_pages(g, query):
+            # zip(*chunk) transposes the fixed-width rows into columns in C,
+            # with no Python-level per-row iteration at all.
+            columns = zip(*chunk)
+            cols = dict(zip(["id", *prop_keys], columns))
+
+            table = _chunk_to_table(cols, int_cols=NODE_ID_COLS, schema=schema)
+            if writer is None:
+                writer = _ChunkWriter(f"nodes_{display}", output_format, table.schema)
+                schema = table.schema
+            elif table.schema != schema:
+                table = _cast_to_file_schema(table, schema, output_format)
+            writer.write(table)
+            count += len(table)
+            # Same on the consumer side: this page's rows and columns must
+            # not stay live while the next page is in flight.
+            del chunk, cols, table
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if count:
+        print(f"✅ Exported {count} nodes with label '{display}' to {writer.filename}")
+    return count
+
+
+def _discover_node_schema(g):
+    """Discover the union of property keys per label, in column order.
+
+    Property keys can differ between nodes, so the key union per label is
+    declared once up front: it fixes the CSV header and the column layout
+    every chunk is assembled against. ``CALL db.propertyKeys()`` would
+    answer from metadata alone, but it returns the graph-wide key union and
+    would pad every per-label file with columns its nodes never carry; the
+    DISTINCT projection keeps columns exact and returns just one row per
+    label/key-set combination.
+    """
+    node_props = {}
+    result = g.ro_query("MATCH (n) RETURN DISTINCT labels(n), keys(n)")
+    for record in result.result_set:
+        for label in record[0] or [_NO_LABEL]:
+            # One C-level bulk merge per key set, not one hashed
+            # setdefault per key.
+            node_props.setdefault(label, {}).update(dict.fromkeys(record[1]))
+    return {label: list(fields) for label, fields in node_props.items()}
+
+
+def _discover_edge_schema(g):
+    """Discover the union of property keys per relationship type.
+
+    The DISTINCT projection also enumerates every type that has at least
+    one edge, so no separate ``CALL db.relationshipTypes()`` round trip is
+    needed.
+    """
+    edge_props = {}
+    result = g.ro_query("MATCH ()-[e]->() RETURN DISTINCT TYPE(e), keys(e)")
+    for record in result.result_set:
+        edge_props.setdefault(record[0], {}).update(dict.fromkeys(record[1]))
+    return {edge_type: list(fields) for edge_type, fields in edge_props.items()}
+
+
+def _schema_cache_path(graph_name, host, port):
+    return os.path.join(
+        _cache_dir(), quote_plus(f"{host}:{port}:{graph_name}") + ".json"
     )
-    edges_by_type = defaultdict(list)
-
-    for record in edges_result.result_set:
-        edge_id = record[0]
-        edge_type = record[1]
-        from_id = record[2]
-        to_id = record[3]
-        props = record[4] or {}
-
-        edge = {
-            "id": edge_id,
-            "from_id": from_id,
-            "to_id": to_id
+
+
+def _graph_schema(graph_name, host, port):
+    """Return (node schema, edge schema), preferring the on-disk cache.
+
+    The discovery scans only depend on the graph's schema, not its data, so
+    their result is cached across runs: a repeated export goes straight to
+    the specialized per-label/per-type queries. Deleting the cache file
+    forces rediscovery after the graph's schema has changed. A graph that
+    was empty at discovery time is never cached, so a later export sees its
+    real schema.
+    """
+    path = _schema_cache_path(graph_name, host, port)
+    try:
+        with open(path, "rb") as f:
+            cached = orjson.loads(f.read())
+        return cached["nodes"], cached["edges"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    g = _connect(host, port).select_graph(graph_name)
+    node_props = _discover_node_schema(g)
+    edge_props = _discover_edge_schema(g)
+
+    if node_props or edge_props:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(orjson.dumps({"nodes": node_props, "edges": edge_props}))
+        except OSError:
+            pass  # the cache is only an optimization
+    return node_props, edge_props
+
+
+def _export_nodes(graph_name, host, port, node_props, output_format):
+    """Export all nodes to one file per label; returns counts by label."""
+    g = _connect(host, port).select_graph(graph_name)
+
+    node_counts = {}
+    for label, prop_keys in node_props.items():
+        count = _export_nodes_of_label(g, label, prop_keys, output_format)
+        if count:
+            node_counts[label] = count
+        # Each label's export can be GB-scale; reclaim anything cyclic it
+        # left behind before the next label allocates its own buffers.
+        gc.collect()
+
+    return node_counts
+
+
+def _export_edges_of_type(graph_name, host, port, edge_type, prop_keys, output_format):
+    """Export edges of a single relationship type; returns the edge count."""
+    g = _connect(host, port).select_graph(graph_name)
+    query = _edge_query(edge_type, prop_keys)
+
+    writer = None
+    schema = None
+    count = 0
+    try:
+        for chunk in _iter_pages(g, query):
+            columns = zip(*chunk)
+            cols = dict(zip(["id", "from_id", "to_id", *prop_keys], columns))
+
+            table = _chunk_to_table(cols, int_cols=EDGE_ID_COLS, schema=schema)
+            if writer is None:
+                writer = _ChunkWriter(f"edges_{edge_type}", output_format, table.schema)
+                schema = table.schema
+            elif table.schema != schema:
+                table = _cast_to_file_schema(table, schema, output_format)
+            writer.write(table)
+            count += len(table)
+            del chunk, cols, table
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if count:
+        print(f"✅ Exported {count} edges of type '{edge_type}' to {writer.filename}")
+    return count
+
+
+def _export_edges(graph_name, host, port, edge_props, output_format):
+    """Export all edges to one file per type; returns counts by type.
+
+    The edge scan is partitioned by relationship type and the per-type
+    scans run in parallel, each on its own connection and writing its own
+    file, so workers never contend on a shared writer.
+    """
+    if not edge_props:
+        return {}
+
+    workers = min(MAX_EDGE_WORKERS, len(edge_props))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            edge_type: executor.submit(
+                _export_edges_of_type, graph_name, host, port,
+                edge_type, prop_keys, output_format,
+            )
+            for edge_type, prop_keys in edge_props.items()
+        }
+        edge_counts = {
+            edge_type: future.result() for edge_type, future in futures.items()
         }
-        edge.update(props)
-        edges_by_type[edge_type].append(edge)
 
-    # Export each edge type to its own CSV file
-    for edge_type, edges in edges_by_type.items():
-        filename = f"edges_{edge_type}.csv"
-        pd.DataFrame(edges).to_csv(filename, index=False)
-        print(f"✅ Exported {len(edges)} edges of type '{edge_type}' to {filename}")
+    return {edge_type: count for edge_type, count in edge_counts.items() if count}
+
+
+def export_graph(graph_name, host, port, output_format="csv"):
+    node_props, edge_props = _graph_schema(graph_name, host, port)
+
+    if _NO_LABEL in node_props and UNLABELED in node_props:
+        # A real label named "unlabeled" would claim the same output file
+        # as the labelless bucket, silently interleaving two node sets.
+        # Refuse up front, before any file is opened.
+        raise ValueError(
+            f"graph '{graph_name}' has both labelless nodes and a label "
+            f"named '{UNLABELED}'; both would export to "
+            f"nodes_{UNLABELED}.{output_format} — rename the label and "
+            f"delete the graph's schema cache file, then re-run"
+        )
+
+    # Nodes and edges are independent read-only queries, so run them
+    # concurrently on two separate connections (redis connections are not
+    # thread-safe to share). hiredis releases the GIL while parsing, so
+    # DB execution, result parsing and file writing genuinely overlap.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        nodes_future = executor.submit(
+            _export_nodes, graph_name, host, port, node_props, output_format
+        )
+        edges_future = executor.submit(
+            _export_edges, graph_name, host, port, edge_props, output_format
+        )
+        node_counts = nodes_future.result()
+        edge_counts = edges_future.result()
 
     # Print summary
     print("\n📊 Summary:")
-    print(f"   Node labels exported: {len(nodes_by_label)}")
-    print(f"   Edge types exported: {len(edges_by_type)}")
+    print(f"   Node labels exported: {len(node_counts)}")
+    print(f"   Edge types exported: {len(edge_counts)}")
 
 def main():
     """Main entry point for the CLI."""
@@ -76,10 +516,14 @@ def main():
     parser.add_argument("graph_name", help="Name of the graph to export")
     parser.add_argument("--host", default="localhost", help="FalkorDB host (default: localhost)")
     parser.add_argument("--port", type=int, default=6379, help="FalkorDB port (default: 6379)")
+    parser.add_argument(
+        "--format", choices=["csv", "parquet"], default="csv",
+        help="Output file format (default: csv)",
+    )
 
     args = parser.parse_args()
 
-    export_graph(args.graph_name, args.host, args.port)
+    export_graph(args.graph_name, args.host, args.port, args.format)
 
 
 if __name__ == "__main__":
@@ -9,7 +9,9 @@ with open("README.md", "r", encoding="utf-8") as fh:
 # Read requirements from Pipfile
 install_requires = [
     "falkordb",
-    "pandas",
+    "hiredis",
+    "orjson",
+    "pyarrow",
 ]
 
 setup(
@@ -1,8 +1,10 @@
 import pytest
 import os
+import json
 import pandas as pd
 from falkordb import FalkorDB
-from main import export_graph
+import main
+from main import export_graph, _schema_cache_path
 import tempfile
 import shutil
 
@@ -46,6 +48,11 @@ class TestGraphExporter:
         except:
             pass
     
+    @pytest.fixture(autouse=True)
+    def isolated_cache(self, tmp_path, monkeypatch):
+        """Point the schema cache at a scratch directory for every test."""
+        monkeypatch.setenv("GRAPH_EXPORTER_CACHE_DIR", str(tmp_path / "schema-cache"))
+
     @pytest.fixture
     def temp_dir(self):
         """Create a temporary directory for test files."""
@@ -238,6 +245,181 @@ class TestGraphExporter:
         except:
             pass
     
+    def test_export_label_named_unlabeled(self, falkordb_connection, temp_dir):
+        """Test that a real 'unlabeled' label is exported and cannot collide with labelless nodes."""
+        graph_name = "label_named_unlabeled_test_graph"
+        g = falkordb_connection.select_graph(graph_name)
+
+        # Clear any existing data
+        try:
+            g.query("MATCH (n) DETACH DELETE n")
+        except:
+            pass
+
+        # A node whose label is literally "unlabeled" must still be exported
+        g.query("CREATE (:unlabeled {name: 'Labeled After All'})")
+
+        export_graph(graph_name, "localhost", 6379)
+
+        assert os.path.exists("nodes_unlabeled.csv"), "nodes_unlabeled.csv should be created"
+        df = pd.read_csv("nodes_unlabeled.csv")
+        assert len(df) == 1, "Should have 1 node with the 'unlabeled' label"
+        assert df.at[0, "name"] == "Labeled After All"
+
+        # Adding a labelless node makes nodes_unlabeled.csv ambiguous; the
+        # export must refuse instead of interleaving the two node sets
+        g.query("CREATE ({name: 'No Label'})")
+        os.remove(_schema_cache_path(graph_name, "localhost", 6379))
+
+        with pytest.raises(ValueError, match="unlabeled"):
+            export_graph(graph_name, "localhost", 6379)
+
+        # Cleanup
+        try:
+            g.query("MATCH (n) DETACH DELETE n")
+        except:
+            pass
+
+    def test_export_parquet_format(self, test_graph, temp_dir):
+        """Test that parquet output creates per-label/type files with the expected content."""
+        export_graph(test_graph, "localhost", 6379, "parquet")
+
+        # Check that label- and type-specific Parquet files were created
+        assert os.path.exists("nodes_Person.parquet"), "nodes_Person.parquet file should be created"
+        assert os.path.exists("nodes_Company.parquet"), "nodes_Company.parquet file should be created"
+        assert os.path.exists("edges_WORKS_FOR.parquet"), "edges_WORKS_FOR.parquet file should be created"
+        assert os.path.exists("edges_KNOWS.parquet"), "edges_KNOWS.parquet file should be created"
+
+        # No CSV files should appear when parquet output is selected
+        csv_files = [f for f in os.listdir('.') if f.endswith('.csv')]
+        assert len(csv_files) == 0, f"Parquet export should not create CSV files, but found: {csv_files}"
+
+        # Person nodes should round-trip with their properties
+        person_df = pd.read_parquet("nodes_Person.parquet")
+        assert len(person_df) == 2, f"Expected 2 Person nodes, got {len(person_df)}"
+        assert "id" in person_df.columns, "Column 'id' should be in nodes_Person.parquet"
+        names = set(person_df["name"].tolist())
+        assert names == {"Alice", "Bob"}, f"Unexpected Person names: {names}"
+        ages = set(person_df["age"].tolist())
+        assert ages == {30, 25}, f"Unexpected Person ages: {ages}"
+
+        # Company nodes should round-trip as well
+        company_df = pd.read_parquet("nodes_Company.parquet")
+        assert len(company_df) == 1, f"Expected 1 Company node, got {len(company_df)}"
+        assert company_df.at[0, "name"] == "TechCorp"
+        assert company_df.at[0, "founded"] == 2010
+
+        # Edges should keep their endpoint columns and properties
+        works_for_df = pd.read_parquet("edges_WORKS_FOR.parquet")
+        assert len(works_for_df) == 1, f"Expected 1 WORKS_FOR edge, got {len(works_for_df)}"
+        for col in ["id", "from_id", "to_id"]:
+            assert col in works_for_df.columns, f"Column '{col}' should be in edges_WORKS_FOR.parquet"
+        assert works_for_df.at[0, "since"] == 2020
+
+        knows_df = pd.read_parquet("edges_KNOWS.parquet")
+        assert len(knows_df) == 1, f"Expected 1 KNOWS edge, got {len(knows_df)}"
+        assert knows_df.at[0, "since"] == 2015
+
+    def test_export_quotes_structural_characters(self, falkordb_connection, temp_dir):
+        """Test that values with CSV structural characters round-trip intact."""
+        graph_name = "quoting_test_graph"
+        g = falkordb_connection.select_graph(graph_name)
+
+        # Clear any existing data
+        try:
+            g.query("MATCH (n) DETACH DELETE n")
+        except:
+            pass
+
+        # Quotes, commas and a newline all force the quoted CSV path
+        tricky = 'He said "hello, world",\nthen left'
+        g.query("CREATE (:Note {text: $text})", {"text": tricky})
+        g.query("CREATE (:Note {text: 'plain'})")
+
+        export_graph(graph_name, "localhost", 6379)
+
+        notes_df = pd.read_csv("nodes_Note.csv")
+        assert len(notes_df) == 2, f"Expected 2 Note nodes, got {len(notes_df)}"
+        texts = set(notes_df["text"].tolist())
+        assert tricky in texts, "Value with structural characters should round-trip intact"
+        assert "plain" in texts, "Plain value should round-trip too"
+
+        # Cleanup
+        try:
+            g.query("MATCH (n) DETACH DELETE n")
+        except:
+            pass
+
+    def test_export_type_conflict_across_pages(self, falkordb_connection, temp_dir, monkeypatch):
+        """Test reconciliation when a property's type changes between pages."""
+        graph_name = "type_conflict_test_graph"
+        g = falkordb_connection.select_graph(graph_name)
+
+        # Clear any existing data
+        try:
+            g.query("MATCH (n) DETACH DELETE n")
+        except:
+            pass
+
+        # The first two nodes pin the column to int64; the third only shows
+        # up on a later page and carries a float
+        g.query("CREATE (:Item {score: 5})")
+        g.query("CREATE (:Item {score: 7})")
+        g.query("CREATE (:Item {score: 2.5})")
+        g.query("CREATE (:Item {score: 3})")
+
+        # Shrink the page so the export actually spans multiple pages
+        monkeypatch.setattr(main, "PAGE_SIZE", 2)
+
+        # CSV output must widen the conflicting column to text, keeping
+        # every value intact instead of truncating or crashing
+        export_graph(graph_name, "localhost", 6379)
+        items_df = pd.read_csv("nodes_Item.csv")
+        assert len(items_df) == 4, f"Expected 4 Item nodes, got {len(items_df)}"
+        scores = sorted(items_df["score"].tolist())
+        assert scores == [2.5, 3, 5, 7], f"Scores should survive the type conflict, got {scores}"
+
+        # Parquet cannot widen a column after the file is created, so the
+        # same conflict must raise an error that points at --format csv
+        with pytest.raises(ValueError, match="--format csv"):
+            export_graph(graph_name, "localhost", 6379, "parquet")
+
+        # Cleanup
+        try:
+            g.query("MATCH (n) DETACH DELETE n")
+        except:
+            pass
+
+    def test_schema_cache_hit_and_miss(self, test_graph, temp_dir):
+        """Test that exports answer from the schema cache and rediscover when it is deleted."""
+        # The first export discovers the schema and writes the cache file
+        export_graph(test_graph, "localhost", 6379)
+        cache_path = _schema_cache_path(test_graph, "localhost", 6379)
+        assert os.path.exists(cache_path), "First export should write the schema cache"
+
+        # Tamper with the cached schema: drop the age property from Person
+        with open(cache_path) as f:
+            cached = json.load(f)
+        assert "age" in cached["nodes"]["Person"]
+        cached["nodes"]["Person"] = ["name"]
+        with open(cache_path, "w") as f:
+            json.dump(cached, f)
+
+        # A repeated export must answer from the cache, so the dropped
+        # column disappears from the output (cache hit)
+        export_graph(test_graph, "localhost", 6379)
+        person_df = pd.read_csv("nodes_Person.csv")
+        assert "age" not in person_df.columns, "Second export should use the cached schema"
+        assert "name" in person_df.columns, "Cached columns should still be exported"
+
+        # Deleting the cache file forces rediscovery (cache miss), which
+        # restores the column and repopulates the cache
+        os.remove(cache_path)
+        export_graph(test_graph, "localhost", 6379)
+        person_df = pd.read_csv("nodes_Person.csv")
+        assert "age" in person_df.columns, "Deleting the cache should force rediscovery"
+        assert os.path.exists(cache_path), "Rediscovery should rewrite the cache file"
+
     def test_export_connection_error(self):
         """Test behavior when FalkorDB connection fails."""
         with pytest.raises(Exception):